@@ -4,12 +4,43 @@ import sys
 import logging
 from pathlib import Path
 import click
-from dotenv import load_dotenv
+from dotenv import dotenv_values, find_dotenv
 from . import __version__
-from .client import ConfluenceClient, ConfluenceAuthError, ConfluenceNotFoundError, ConfluenceConnectionError
+from .client import CONNECTION_POOL_SIZE, PAGINATION_WORKERS, ConfluenceClient, ConfluenceAuthError, ConfluenceNotFoundError, ConfluenceConnectionError
 from .exporter import PageExporter
 from .update_checker import UpdateChecker, format_update_message
 
+# Parsed .env files keyed by (path, mtime_ns)
+_DOTENV_CACHE = {}
+
+
+def _maybe_load_dotenv(url, user, token) -> None:
+    """Load .env into the environment unless all credentials were given as CLI args.
+    
+    Existing environment variables are never overridden. Parsed files are
+    cached per path and modification time, so repeated calls in the same
+    process skip re-reading the file.
+    """
+    if url and user and token:
+        return
+    
+    dotenv_path = find_dotenv()
+    if not dotenv_path:
+        return
+    
+    try:
+        key = (dotenv_path, os.stat(dotenv_path).st_mtime_ns)
+    except OSError:
+        return
+    values = _DOTENV_CACHE.get(key)
+    if values is None:
+        values = dotenv_values(dotenv_path)
+        _DOTENV_CACHE[key] = values
+    
+    for name, value in values.items():
+        if value is not None:
+            os.environ.setdefault(name, value)
+
 
 @click.command()
 @click.version_option(version=__version__, prog_name='confluence-md')
@@ -18,13 +49,15 @@ from .update_checker import UpdateChecker, format_update_message
 @click.option('--url', help='Confluence base URL (or set CONFLUENCE_URL env var)')
 @click.option('--user', help='Username/email for Cloud, omit for Server PAT (or set CONFLUENCE_USER)')
 @click.option('--token', help='API token (Cloud) or Personal Access Token (Server) (or set CONFLUENCE_TOKEN)')
-@click.option('--delay-ms', default=100, type=int, help='Delay between API calls in milliseconds (default: 100)')
+@click.option('--delay-ms', default=100, type=int, help='Minimum delay between API requests in milliseconds (default: 100)')
+@click.option('--workers', default=4, type=click.IntRange(min=1), help='Number of pages exported concurrently (default: 4)')
 @click.option('--timeout', default=30, type=int, help='HTTP request timeout in seconds (default: 30)')
-@click.option('--skip-existing', is_flag=True, help='Skip files that already exist (resume capability)')
+@click.option('--bulk-fetch', is_flag=True, help='Fetch the whole page tree through CQL search (fewer API calls; relies on the search index)')
+@click.option('--skip-existing', is_flag=True, help='Skip pages whose exported file is already up to date (resume capability)')
 @click.option('--max-depth', default=50, type=int, help='Maximum recursion depth (default: 50)')
 @click.option('--verbose', is_flag=True, help='Enable verbose logging')
 @click.option('--no-update-check', is_flag=True, help='Disable update check')
-def main(page_id, output_path, url, user, token, delay_ms, timeout, skip_existing, max_depth, verbose, no_update_check):
+def main(page_id, output_path, url, user, token, delay_ms, workers, timeout, bulk_fetch, skip_existing, max_depth, verbose, no_update_check):
     """Export Confluence pages to Markdown files recursively."""
         # Start background update check (non-blocking)
     update_checker = None
@@ -32,8 +65,8 @@ def main(page_id, output_path, url, user, token, delay_ms, timeout, skip_existin
     if should_check_updates:
         update_checker = UpdateChecker(__version__)
         update_checker.start()
-        # Load environment variables from .env file
-    load_dotenv()
+    # Load environment variables from .env file (only if credentials are missing)
+    _maybe_load_dotenv(url, user, token)
     
     # Setup logging
     if verbose:
@@ -48,9 +81,9 @@ def main(page_id, output_path, url, user, token, delay_ms, timeout, skip_existin
         )
     
     # Resolve credentials independently (CLI args > system env var > .env file)
-    confluence_url = url or os.getenv('CONFLUENCE_URL')
-    confluence_user = user or os.getenv('CONFLUENCE_USER') or None  # User is optional for Server PAT
-    confluence_token = token or os.getenv('CONFLUENCE_TOKEN')
+    confluence_url = url or os.environ.get('CONFLUENCE_URL')
+    confluence_user = user or os.environ.get('CONFLUENCE_USER') or None  # User is optional for Server PAT
+    confluence_token = token or os.environ.get('CONFLUENCE_TOKEN')
     
     # Validate required credentials
     if not confluence_url:
@@ -72,24 +105,31 @@ def main(page_id, output_path, url, user, token, delay_ms, timeout, skip_existin
         click.echo(f"Error: Output directory '{output_path}' is not writable", err=True)
         sys.exit(2)
     
-    # Instantiate Confluence client (user is optional for Server PAT)
-    client = ConfluenceClient(confluence_url, confluence_token, user=confluence_user, timeout=timeout)
+    # Instantiate Confluence client (user is optional for Server PAT), with
+    # enough pooled connections for every worker to fetch a page while its
+    # children are paginated concurrently
+    pool_size = max(CONNECTION_POOL_SIZE, workers * (PAGINATION_WORKERS + 1))
+    client = ConfluenceClient(confluence_url, confluence_token, user=confluence_user, timeout=timeout, delay_ms=delay_ms, pool_size=pool_size)
     
     # Instantiate exporter
     exporter = PageExporter(
         client=client,
         output_path=Path(output_path),
-        delay_ms=delay_ms,
         base_url=confluence_url,
         skip_existing=skip_existing,
-        max_depth=max_depth
+        max_depth=max_depth,
+        workers=workers,
+        bulk_fetch=bulk_fetch
     )
     
     # Execute export with progress reporting
-    mode_msg = " (resuming, skipping existing files)" if skip_existing else ""
+    mode_msg = " (resuming, skipping up-to-date files)" if skip_existing else ""
     click.echo(f"Exporting page {page_id} to {output_path}{mode_msg}...")
-    click.echo(f"Settings: timeout={timeout}s, delay={delay_ms}ms, max_depth={max_depth}")
-    success_count, failure_count = exporter.export_tree(page_id, Path(output_path))
+    click.echo(f"Settings: timeout={timeout}s, delay={delay_ms}ms, workers={workers}, max_depth={max_depth}")
+    try:
+        success_count, failure_count = exporter.export_tree(page_id, Path(output_path))
+    finally:
+        client.close()
     
     # Report results and exit with appropriate code
     exit_code = 0
@@ -1,12 +1,36 @@
 """Confluence API client wrapper with authentication and page fetching."""
 import time
+import random
 import logging
-from typing import List, Dict
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 from atlassian import Confluence
+import requests
+import requests.adapters
 import requests.exceptions
 
 logger = logging.getLogger(__name__)
 
+# Number of child-page batches fetched concurrently once a parent turns out
+# to have more children than fit in a single response
+PAGINATION_WORKERS = 4
+
+# Default keep-alive connections kept per host, shared by all concurrent requests
+CONNECTION_POOL_SIZE = 16
+
+# Expansions needed to convert a page (body, metadata and hierarchy)
+PAGE_EXPAND = 'body.storage,history,version,space,ancestors'
+
+# Page size requested from the content search endpoint (the server may cap it lower)
+SEARCH_BATCH_SIZE = 100
+
+# HTTP status codes that are retried, and base delays (seconds) between attempts
+_RETRYABLE = frozenset((429, 503))
+_DELAYS = (1.0, 2.0, 4.0)
+_MAX_ATTEMPTS = 4
+
 
 # Custom exceptions
 class ConfluenceAuthError(Exception):
@@ -29,10 +53,134 @@ class ConfluenceAPIError(Exception):
     pass
 
 
+class RateLimiter:
+    """Thread-safe limiter spacing request starts at least `delay_ms` apart."""
+    
+    def __init__(self, delay_ms: int):
+        """Initialize rate limiter.
+        
+        Args:
+            delay_ms: Minimum delay in milliseconds between requests (0 disables)
+        """
+        self.interval = max(delay_ms, 0) / 1000.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        if self.interval <= 0:
+            # Pacing is fixed for the client's lifetime; skip the lock and clock entirely
+            self.acquire = lambda: None
+    
+    def acquire(self):
+        """Block until the next request slot is available.
+        
+        Slots are reserved under the lock and waited for outside it, so time
+        spent on a previous response counts towards the spacing.
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _retry(method):
+    """Decorate a ConfluenceClient method with rate limiting and backoff retry.
+    
+    Retries on 429 (rate limit) and 503 (service unavailable).
+    Total attempts: 4 (1 initial + 3 retries)
+    Delays: 1s, 2s, 4s, each scaled by a random 0.5-1.5 jitter so concurrent
+    workers don't retry in lockstep
+    
+    Raises:
+        Original exception when not retryable or after all retries exhausted
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            try:
+                return method(self, *args, **kwargs)
+            except requests.exceptions.HTTPError as e:
+                status_code = e.response.status_code if e.response is not None else None
+                if status_code not in _RETRYABLE or attempt >= _MAX_ATTEMPTS - 1:
+                    # Not retryable or out of retries
+                    logger.error(f"HTTP error {status_code}: {e}")
+                    raise
+                
+                # Honour Retry-After seconds when present (HTTP-date values fall back to backoff)
+                retry_after = e.response.headers.get('Retry-After')
+                try:
+                    delay = max(int(retry_after), 0)
+                except (TypeError, ValueError):
+                    delay = _DELAYS[min(attempt, len(_DELAYS) - 1)] * (0.5 + random.random())
+                logger.warning("Rate limited (%s), retrying in %.1fs (attempt %d/%d)",
+                               status_code, delay, attempt + 1, _MAX_ATTEMPTS)
+                time.sleep(delay)
+                attempt += 1
+    
+    return wrapper
+
+
+def _raise_client_error(error: requests.exceptions.RequestException, page_id: str):
+    """Re-raise a requests exception as the matching client exception.
+    
+    Args:
+        error: Exception raised by requests
+        page_id: Page ID the request was about (for the not-found message)
+        
+    Raises:
+        ConfluenceAuthError: Authentication failed (401/403)
+        ConfluenceNotFoundError: Page not found (404)
+        ConfluenceConnectionError: Connection failed or timed out
+        ConfluenceAPIError: Other API errors
+    """
+    if isinstance(error, requests.exceptions.HTTPError):
+        if getattr(error, 'response', None) is not None:
+            status_code = error.response.status_code
+            if status_code in (401, 403):
+                raise ConfluenceAuthError(f"Authentication failed: {error}") from error
+            elif status_code == 404:
+                raise ConfluenceNotFoundError(f"Page {page_id} not found") from error
+            else:
+                raise ConfluenceAPIError(f"API error ({status_code}): {error}") from error
+        raise ConfluenceAPIError(f"API error: {error}") from error
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        raise ConfluenceConnectionError(f"Connection failed: {error}") from error
+    raise error
+
+
+def _normalize_children_page(result, limit: int) -> Tuple[List[dict], bool]:
+    """Normalize a child-page API response to (children, has_more).
+    
+    The Atlassian library returns either the results list directly (a full
+    batch means there may be more) or the full response dict (more pages are
+    signalled by a `_links.next` link).
+    """
+    if isinstance(result, list):
+        return result, len(result) >= limit
+    if isinstance(result, dict):
+        return result.get('results') or [], 'next' in (result.get('_links') or {})
+    logger.error(f"Unexpected response type: {type(result)}")
+    return [], False
+
+
+def _attach_html(page: dict) -> dict:
+    """Store a page's storage-format body under '_html' (empty string if missing).
+    
+    Resolves the nested body lookup once when the page is fetched, so
+    consumers read the HTML with a single key access.
+    """
+    body = page.get('body')
+    storage = body.get('storage') if body else None
+    page['_html'] = (storage.get('value') if storage else None) or ''
+    return page
+
+
 class ConfluenceClient:
     """Wrapper for Confluence API operations with retry logic."""
     
-    def __init__(self, url: str, token: str, user: str = None, timeout: int = 30):
+    def __init__(self, url: str, token: str, user: str = None, timeout: int = 30, delay_ms: int = 0, pool_size: int = CONNECTION_POOL_SIZE):
         """Initialize Confluence API client.
         
         Args:
@@ -40,78 +188,82 @@ class ConfluenceClient:
             token: Personal Access Token or API token
             user: Username/email (for Cloud with API token) or None (for Server with PAT)
             timeout: Request timeout in seconds (default: 30)
+            delay_ms: Minimum delay in milliseconds between API requests (default: 0)
+            pool_size: Keep-alive connections kept open; should cover the number of
+                requests in flight at once (default: 16)
         """
+        # One pooled keep-alive session for all requests (avoids repeated TCP/TLS handshakes)
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=0
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive'})
+        
         # Confluence Server (on-premise) uses token-only Bearer auth
         # Confluence Cloud uses username + API token as password
         if user:
             logger.info(f"Using username+token authentication for {url}")
-            self.client = Confluence(url=url, username=user, password=token, timeout=timeout)
+            self.client = Confluence(url=url, username=user, password=token, timeout=timeout, session=self.session)
         else:
             logger.info(f"Using token-only (Bearer) authentication for {url}")
-            self.client = Confluence(url=url, token=token, timeout=timeout)
+            self.client = Confluence(url=url, token=token, timeout=timeout, session=self.session)
         
         self.base_url = url
         self.timeout = timeout
+        self.rate_limiter = RateLimiter(delay_ms)
     
-    def _retry_with_backoff(self, func, *args, **kwargs) -> Dict:
-        """Execute function with exponential backoff retry logic.
-        
-        Retries on 429 (rate limit) and 503 (service unavailable).
-        Total attempts: 4 (1 initial + 3 retries)
-        Delays: 1s, 2s, 4s
+    def close(self):
+        """Close the underlying HTTP session and its pooled connections."""
+        self.session.close()
+    
+    @_retry
+    def _get_page_by_id(self, page_id: str, expand: str) -> dict:
+        """Fetch a page object from the API (rate limited and retried)."""
+        return self.client.get_page_by_id(page_id=page_id, expand=expand)
+    
+    @_retry
+    def _get_page_children(self, page_id: str, start: int, limit: int):
+        """Fetch one batch of child pages from the API (rate limited and retried)."""
+        return self.client.get_page_child_by_type(page_id=page_id, type='page', start=start, limit=limit)
+    
+    @_retry
+    def _search_content(self, cql: str, expand: str, next_path: Optional[str] = None) -> dict:
+        """Fetch one batch of CQL search results (rate limited and retried)."""
+        if next_path:
+            # The _links.next cursor already carries the query string
+            return self.client.get(next_path)
+        return self.client.get('rest/api/content/search', params={'cql': cql, 'expand': expand, 'limit': SEARCH_BATCH_SIZE})
+    
+    def get_page(self, page_id: str) -> dict:
+        """Fetch single page with full metadata.
         
         Args:
-            func: Function to execute
-            *args: Positional arguments for func
-            **kwargs: Keyword arguments for func
+            page_id: Confluence page ID
             
         Returns:
-            Function result
+            Full page object with HTML body, metadata, and hierarchy; the
+            storage-format HTML is also available as page['_html']
             
         Raises:
-            Original exception after all retries exhausted
+            ConfluenceAuthError: Authentication failed (401/403)
+            ConfluenceNotFoundError: Page not found (404)
+            ConfluenceConnectionError: Connection failed
+            ConfluenceAPIError: Other API errors
         """
-        delays = [1, 2, 4]
-        attempt = 0
-        last_exception = None
-        
-        while attempt < 4:  # 1 initial + 3 retries
-            try:
-                return func(*args, **kwargs)
-            except requests.exceptions.HTTPError as e:
-                last_exception = e
-                if hasattr(e, 'response') and e.response is not None:
-                    status_code = e.response.status_code
-                    if status_code in (429, 503) and attempt < 4:
-                        # Check for Retry-After header
-                        retry_after = e.response.headers.get('Retry-After')
-                        if retry_after and retry_after.isdigit():
-                            delay = int(retry_after)
-                            logger.warning(f"Rate limited (429/503), retrying in {delay}s (attempt {attempt + 1}/4)")
-                        else:
-                            delay = delays[min(attempt, len(delays) - 1)]
-                            logger.warning(f"Rate limited (429/503), retrying in {delay}s (attempt {attempt + 1}/4)")
-                        time.sleep(delay)
-                        attempt += 1
-                        continue
-                # Not retryable or out of retries
-                logger.error(f"HTTP error {status_code}: {e}")
-                raise
-            except Exception as e:
-                # Other exceptions don't get retried
-                raise
-        
-        # If we get here, all retries exhausted
-        raise last_exception
+        return _attach_html(self._fetch_page(page_id, PAGE_EXPAND))
     
-    def get_page(self, page_id: str) -> dict:
-        """Fetch single page with full metadata.
+    def get_page_metadata_only(self, page_id: str) -> dict:
+        """Fetch page title and version without the body (cheap up-to-date check).
         
         Args:
             page_id: Confluence page ID
             
         Returns:
-            Full page object with HTML body, metadata, and hierarchy
+            Page object with id, title and version (no body or hierarchy)
             
         Raises:
             ConfluenceAuthError: Authentication failed (401/403)
@@ -119,27 +271,32 @@ class ConfluenceClient:
             ConfluenceConnectionError: Connection failed
             ConfluenceAPIError: Other API errors
         """
+        return self._fetch_page(page_id, 'version')
+    
+    def _fetch_page(self, page_id: str, expand: str) -> dict:
+        """Fetch page with the given expansions, mapping HTTP errors to client exceptions."""
         try:
-            logger.debug(f"Fetching page {page_id}")
-            result = self._retry_with_backoff(
-                self.client.get_page_by_id,
-                page_id=page_id,
-                expand='body.storage,history,version,space,ancestors'
-            )
+            logger.debug(f"Fetching page {page_id} (expand={expand})")
+            result = self._get_page_by_id(page_id, expand=expand)
             logger.debug(f"Successfully fetched page {page_id}")
             return result
-        except requests.exceptions.HTTPError as e:
-            if hasattr(e, 'response') and e.response is not None:
-                status_code = e.response.status_code
-                if status_code in (401, 403):
-                    raise ConfluenceAuthError(f"Authentication failed: {e}") from e
-                elif status_code == 404:
-                    raise ConfluenceNotFoundError(f"Page {page_id} not found") from e
-                else:
-                    raise ConfluenceAPIError(f"API error ({status_code}): {e}") from e
-            raise ConfluenceAPIError(f"API error: {e}") from e
-        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
-            raise ConfluenceConnectionError(f"Connection failed: {e}") from e
+        except requests.exceptions.RequestException as e:
+            _raise_client_error(e, page_id)
+    
+    def _fetch_child_batch(self, page_id: str, start: int, limit: int) -> Tuple[List[dict], bool]:
+        """Fetch one batch of child pages.
+        
+        Args:
+            page_id: Parent page ID
+            start: Offset of the first child to return
+            limit: Maximum number of children to return
+            
+        Returns:
+            Tuple of (children, has_more)
+        """
+        children, has_more = _normalize_children_page(self._get_page_children(page_id, start, limit), limit)
+        logger.debug(f"Added {len(children)} children of page {page_id} at offset {start}")
+        return children, has_more
     
     def get_child_pages(self, page_id: str) -> List[dict]:
         """Fetch all child pages with pagination handling.
@@ -156,65 +313,69 @@ class ConfluenceClient:
             ConfluenceAPIError: Other API errors
         """
         all_children = []
-        start = 0
         limit = 100
         
         try:
             logger.debug(f"Fetching child pages for {page_id}")
-            while True:
-                # Fetch page of results
-                result = self._retry_with_backoff(
-                    self.client.get_page_child_by_type,
-                    page_id=page_id,
-                    type='page',
-                    start=start,
-                    limit=limit
-                )
-                
-                # Handle both response formats (dict with 'results' key, or list directly)
-                if isinstance(result, list):
-                    # Library returned list directly
-                    batch_size = len(result)
-                    all_children.extend(result)
-                    logger.debug(f"Added {batch_size} children (total: {len(all_children)})")
-                    # If we got less than limit, we're done
-                    if batch_size < limit:
-                        break
-                    start += limit
-                elif isinstance(result, dict):
-                    # Library returned full response dict
-                    logger.debug(f"API response keys: {result.keys()}")
-                    
-                    # Add results to accumulator
-                    if 'results' in result:
-                        batch_size = len(result['results'])
-                        all_children.extend(result['results'])
-                        logger.debug(f"Added {batch_size} children (total: {len(all_children)})")
-                    else:
-                        logger.warning(f"No 'results' key in API response for page {page_id}")
-                    
-                    # Check if there are more pages
-                    if '_links' in result and 'next' in result['_links']:
-                        start += limit
-                        logger.debug(f"More pages available, continuing with start={start}")
-                    else:
-                        break
-                else:
-                    logger.error(f"Unexpected response type: {type(result)}")
-                    break
+            batch, has_more = self._fetch_child_batch(page_id, 0, limit)
+            all_children.extend(batch)
+            
+            if has_more:
+                # Total child count is not exposed by the API, so request the
+                # following offsets in concurrent windows until a short batch
+                start = limit
+                with ThreadPoolExecutor(max_workers=PAGINATION_WORKERS) as pool:
+                    while has_more:
+                        offsets = [start + i * limit for i in range(PAGINATION_WORKERS)]
+                        logger.debug(f"More pages available, fetching offsets {offsets}")
+                        # map() yields results in submission order, keeping children sorted
+                        batches = pool.map(lambda offset: self._fetch_child_batch(page_id, offset, limit), offsets)
+                        for batch, has_more in batches:
+                            all_children.extend(batch)
+                            if not has_more:
+                                break
+                        start += PAGINATION_WORKERS * limit
             
             logger.info(f"Found {len(all_children)} child pages for page {page_id}")
             return all_children
             
-        except requests.exceptions.HTTPError as e:
-            if hasattr(e, 'response') and e.response is not None:
-                status_code = e.response.status_code
-                if status_code in (401, 403):
-                    raise ConfluenceAuthError(f"Authentication failed: {e}") from e
-                elif status_code == 404:
-                    raise ConfluenceNotFoundError(f"Page {page_id} not found") from e
-                else:
-                    raise ConfluenceAPIError(f"API error ({status_code}): {e}") from e
-            raise ConfluenceAPIError(f"API error: {e}") from e
-        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
-            raise ConfluenceConnectionError(f"Connection failed: {e}") from e
+        except requests.exceptions.RequestException as e:
+            _raise_client_error(e, page_id)
+    
+    def search_descendants(self, page_id: str) -> List[dict]:
+        """Fetch all descendant pages, with bodies, through CQL content search.
+        
+        Returns whole batches of fully expanded pages, so a subtree costs one
+        request per batch instead of two per page. Results come from the
+        search index, which can lag behind recent edits and page moves.
+        
+        Args:
+            page_id: Root page ID (not included in the results)
+            
+        Returns:
+            List of page objects expanded like get_page (including '_html'),
+            oldest first
+            
+        Raises:
+            ConfluenceAuthError: Authentication failed
+            ConfluenceConnectionError: Connection failed
+            ConfluenceAPIError: Other API errors
+        """
+        descendants = []
+        cql = f"ancestor={page_id} and type=page order by created"
+        next_path = None
+        
+        try:
+            logger.debug(f"Searching descendants of page {page_id}")
+            while True:
+                result = self._search_content(cql, PAGE_EXPAND, next_path)
+                descendants.extend(_attach_html(page) for page in result.get('results', []))
+                next_path = result.get('_links', {}).get('next')
+                if not next_path:
+                    break
+            
+            logger.info(f"Found {len(descendants)} descendant pages for page {page_id}")
+            return descendants
+            
+        except requests.exceptions.RequestException as e:
+            _raise_client_error(e, page_id)
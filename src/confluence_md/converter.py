@@ -1,10 +1,288 @@
 """HTML to Markdown converter with metadata extraction."""
 import re
 import unicodedata
-from typing import Dict
+from html import escape
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 from markdownify import markdownify
 import yaml
 
+# lxml (libxml2) is an optional, much faster parser; markdownify is the fallback
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:
+    etree = None
+    lxml_html = None
+
+
+# libyaml's C emitter/parser when PyYAML was built with it, pure-Python otherwise
+_YAML_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Characters outside the Basic Multilingual Plane (e.g. emoji), which libyaml's
+# emitter escapes even with allow_unicode; such metadata uses the Python dumper
+_NON_BMP = re.compile('[\U00010000-\U0010FFFF]')
+
+# Single-pass slug table for ASCII text: letters lowercased, whitespace turned
+# into hyphens, anything but letters, digits, '_' and '-' removed
+_SLUG_TABLE = str.maketrans({
+    chr(i): chr(i).lower() if chr(i).isalnum() or chr(i) in '_-' else ('-' if chr(i).isspace() else None)
+    for i in range(128)
+})
+
+# Runs of hyphens collapsed to one
+_SLUG_DASH = re.compile(r'-{2,}')
+
+# CDATA sections of storage format (a literal ']]>' is split across two sections)
+_CDATA = re.compile(r'<!\[CDATA\[(.*?)\]\]>', re.DOTALL)
+
+# Tags rendered as standalone blocks separated by blank lines
+_BLOCK_TAGS = frozenset((
+    'p', 'div', 'section', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'ul', 'ol', 'pre', 'blockquote', 'table', 'hr',
+    'ac:structured-macro', 'ac:rich-text-body', 'ac:layout',
+    'ac:layout-section', 'ac:layout-cell', 'ac:task-list',
+))
+
+# Tags whose content is never rendered (macro parameters, placeholders, scripts)
+_SKIP_TAGS = frozenset(('ac:parameter', 'ac:placeholder', 'script', 'style', 'head'))
+
+# Bullet characters cycled by list nesting level (matches markdownify)
+_BULLETS = '*+-'
+
+_WHITESPACE = re.compile(r'[ \t\r\n\f]+')
+_ESCAPE = re.compile(r'([*_])')
+
+
+class _HTMLToMD:
+    """Markdown renderer over an lxml tree for Confluence storage-format HTML.
+    
+    Covers the small tag vocabulary Confluence produces (headings, paragraphs,
+    lists, links, emphasis, code, tables, code macros). Unknown elements,
+    including most macros, render their children.
+    """
+    
+    def __init__(self):
+        self._list_depth = 0
+        self._inline_handlers = {
+            'strong': self._emphasis('**'), 'b': self._emphasis('**'),
+            'em': self._emphasis('*'), 'i': self._emphasis('*'),
+            's': self._emphasis('~~'), 'del': self._emphasis('~~'),
+            'strike': self._emphasis('~~'),
+            'code': self._inline_code, 'a': self._link, 'img': self._image,
+            'br': self._line_break, 'ac:image': self._ac_image, 'ac:link': self._ac_link,
+        }
+        self._block_handlers = {
+            'h1': self._heading, 'h2': self._heading, 'h3': self._heading,
+            'h4': self._heading, 'h5': self._heading, 'h6': self._heading,
+            'ul': self._list, 'ol': self._list, 'pre': self._pre,
+            'blockquote': self._blockquote, 'table': self._table,
+            'hr': lambda el: '---', 'ac:structured-macro': self._macro,
+        }
+    
+    def convert(self, html: str) -> str:
+        """Convert an HTML fragment to Markdown."""
+        # The HTML parser doesn't know CDATA (macro bodies); it would end the
+        # section at the first '>', so turn it into escaped text first
+        html = _CDATA.sub(lambda m: escape(m.group(1), quote=False), html)
+        root = lxml_html.fragment_fromstring(html, create_parent='div')
+        return self._flow(root)
+    
+    def _flow(self, el, separator: str = '\n\n') -> str:
+        """Render mixed inline/block content as blocks joined by `separator`."""
+        return separator.join(block for block, _ in self._blocks(el))
+    
+    def _blocks(self, el) -> List[Tuple[str, Optional[str]]]:
+        """Render mixed inline/block content as (markdown, tag) pairs.
+        
+        The tag is that of the block element, or None for a run of inline content.
+        """
+        blocks: List[Tuple[str, Optional[str]]] = []
+        inline: List[str] = []
+        
+        def flush():
+            text = ''.join(inline).strip()
+            if text:
+                blocks.append((text, None))
+            inline.clear()
+        
+        if el.text:
+            inline.append(self._text(el.text))
+        for child in el:
+            if isinstance(child.tag, str) and child.tag not in _SKIP_TAGS:
+                if child.tag in _BLOCK_TAGS:
+                    flush()
+                    handler = self._block_handlers.get(child.tag, self._flow)
+                    block = handler(child)
+                    if block:
+                        blocks.append((block, child.tag))
+                else:
+                    inline.append(self._inline(child))
+            if child.tail:
+                inline.append(self._text(child.tail))
+        flush()
+        return blocks
+    
+    def _inline(self, el) -> str:
+        """Render an element in inline context."""
+        handler = self._inline_handlers.get(el.tag)
+        if handler is not None:
+            return handler(el)
+        return self._inline_children(el)
+    
+    def _inline_children(self, el) -> str:
+        """Render element content in inline context, flattening any blocks."""
+        out = [self._text(el.text)] if el.text else []
+        for child in el:
+            if isinstance(child.tag, str) and child.tag not in _SKIP_TAGS:
+                out.append(self._inline(child) if child.tag not in _BLOCK_TAGS else ' ' + self._flow(child, ' ') + ' ')
+            if child.tail:
+                out.append(self._text(child.tail))
+        return ''.join(out)
+    
+    @staticmethod
+    def _text(text: str) -> str:
+        """Collapse whitespace and escape Markdown emphasis characters."""
+        return _ESCAPE.sub(r'\\\1', _WHITESPACE.sub(' ', text))
+    
+    def _emphasis(self, marker: str):
+        def render(el) -> str:
+            text = self._inline_children(el)
+            stripped = text.strip()
+            if not stripped:
+                return text
+            # Keep surrounding whitespace outside the markers
+            prefix = ' ' if text[0] == ' ' else ''
+            suffix = ' ' if text[-1] == ' ' else ''
+            return f"{prefix}{marker}{stripped}{marker}{suffix}"
+        return render
+    
+    def _inline_code(self, el) -> str:
+        text = _WHITESPACE.sub(' ', el.text_content())
+        return f"`{text}`" if text.strip() else text
+    
+    def _link(self, el) -> str:
+        text = self._inline_children(el).strip()
+        href = el.get('href')
+        if not href or not text:
+            return text
+        return f"[{text}]({href})"
+    
+    def _image(self, el) -> str:
+        src = el.get('src')
+        return f"![{el.get('alt', '')}]({src})" if src else ''
+    
+    def _line_break(self, el) -> str:
+        return '  \n'
+    
+    def _ac_image(self, el) -> str:
+        for child in el:
+            if child.tag == 'ri:url' and child.get('ri:value'):
+                return f"![]({child.get('ri:value')})"
+            if child.tag == 'ri:attachment' and child.get('ri:filename'):
+                return f"![]({child.get('ri:filename')})"
+        return ''
+    
+    def _ac_link(self, el) -> str:
+        title = ''
+        for child in el:
+            if child.tag in ('ac:plain-text-link-body', 'ac:link-body'):
+                text = self._inline_children(child).strip()
+                if text:
+                    return text
+            elif child.tag == 'ri:page':
+                title = child.get('ri:content-title', '')
+        return self._text(title)
+    
+    def _heading(self, el) -> str:
+        text = self._inline_children(el).replace('\n', ' ').strip()
+        return f"{'#' * int(el.tag[1])} {text}" if text else ''
+    
+    def _list(self, el) -> str:
+        bullet = _BULLETS[self._list_depth % len(_BULLETS)]
+        self._list_depth += 1
+        items = []
+        try:
+            for child in el:
+                if child.tag != 'li':
+                    continue
+                prefix = f"{len(items) + 1}. " if el.tag == 'ol' else f"{bullet} "
+                # Paragraphs within an item stay separate; nested lists stay tight
+                content = ''
+                for block, tag in self._blocks(child):
+                    if content:
+                        content += '\n' if tag in ('ul', 'ol') else '\n\n'
+                    content += block
+                indent = ' ' * len(prefix)
+                lines = content.split('\n')
+                items.append(prefix + lines[0] + ''.join(
+                    '\n' + (indent + line if line else '') for line in lines[1:]
+                ))
+        finally:
+            self._list_depth -= 1
+        return '\n'.join(items)
+    
+    @staticmethod
+    def _fence(code: str, language: str = '') -> str:
+        return f"```{language}\n{code.strip(chr(10))}\n```"
+    
+    def _pre(self, el) -> str:
+        return self._fence(el.text_content())
+    
+    def _macro(self, el) -> str:
+        if el.get('ac:name') not in ('code', 'noformat'):
+            return self._flow(el)
+        language = ''
+        code = ''
+        for child in el:
+            if child.tag == 'ac:parameter' and child.get('ac:name') == 'language':
+                language = (child.text or '').strip()
+            elif child.tag == 'ac:plain-text-body':
+                # CDATA was escaped to plain text before parsing (see convert)
+                code = child.text or ''
+        return self._fence(code, language)
+    
+    def _blockquote(self, el) -> str:
+        content = self._flow(el)
+        return '\n'.join(f"> {line}" if line else '>' for line in content.split('\n'))
+    
+    def _table(self, el) -> str:
+        rows = []
+        # Only rows of this table, not of tables nested in its cells
+        for section in el:
+            for tr in (section if section.tag in ('thead', 'tbody', 'tfoot') else [section]):
+                if tr.tag != 'tr':
+                    continue
+                cells = [
+                    self._flow(cell, ' ').replace('\n', ' ').replace('|', '\\|')
+                    for cell in tr if cell.tag in ('th', 'td')
+                ]
+                if cells:
+                    rows.append(cells)
+        if not rows:
+            return ''
+        width = max(len(row) for row in rows)
+        lines = []
+        for index, row in enumerate(rows):
+            row = row + [''] * (width - len(row))
+            lines.append('| ' + ' | '.join(row) + ' |')
+            if index == 0:
+                lines.append('| ' + ' | '.join(['---'] * width) + ' |')
+        return '\n'.join(lines)
+
+
+def _html_to_markdown(html: str) -> str:
+    """Convert HTML to Markdown, preferring the lxml renderer when available."""
+    if lxml_html is not None:
+        if not html.strip():
+            return ''
+        try:
+            return _HTMLToMD().convert(html)
+        except (etree.ParserError, ValueError):
+            pass
+    return markdownify(html, heading_style="ATX")
+
 
 def slugify(text: str) -> str:
     """Convert page title to safe filesystem name.
@@ -15,16 +293,12 @@ def slugify(text: str) -> str:
     Returns:
         Slugified filename (lowercase, hyphens, ASCII only, max 100 chars)
     """
-    # Normalize Unicode to NFKD and encode to ASCII
-    text = unicodedata.normalize('NFKD', text)
-    text = text.encode('ascii', 'ignore').decode('ascii')
-    
-    # Lowercase
-    text = text.lower()
+    # Normalize Unicode to NFKD and encode to ASCII (already-ASCII titles skip this)
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
     
-    # Replace spaces and special chars with hyphens
-    text = re.sub(r'[^\w\s-]', '', text)
-    text = re.sub(r'[-\s]+', '-', text)
+    # Lowercase, drop special chars, replace spaces and runs of hyphens with one hyphen
+    text = _SLUG_DASH.sub('-', text.translate(_SLUG_TABLE))
     
     # Remove leading/trailing hyphens
     text = text.strip('-')
@@ -50,36 +324,27 @@ def extract_metadata(page: dict, base_url: str) -> dict:
     Returns:
         Dictionary with frontmatter fields
     """
-    metadata = {}
+    # Resolve each nested object once ("or {}" also covers explicit nulls)
+    history = page.get('history') or {}
+    created_by = history.get('createdBy') or {}
+    version = page.get('version') or {}
+    space = page.get('space') or {}
+    webui_link = (page.get('_links') or {}).get('webui')
+    ancestors = page.get('ancestors')
     
     # All fields use None for missing values (consistent handling)
-    metadata['title'] = page.get('title') or None
-    metadata['page_id'] = page.get('id') or None
-    metadata['space_key'] = page.get('space', {}).get('key') or None
-    
-    # Author
-    created_by = page.get('history', {}).get('createdBy', {})
-    metadata['author'] = created_by.get('displayName') or None
-    
-    # Dates
-    metadata['created'] = page.get('history', {}).get('createdDate') or None
-    metadata['modified'] = page.get('version', {}).get('when') or None
-    
-    # URL (relative from API, prepend base URL)
-    webui_link = page.get('_links', {}).get('webui')
-    if webui_link:
-        metadata['url'] = base_url + webui_link
-    else:
-        metadata['url'] = None
-    
-    # Parent ID (from ancestors array, use last one)
-    ancestors = page.get('ancestors', [])
-    if ancestors:
-        metadata['parent_id'] = ancestors[-1].get('id') or None
-    else:
-        metadata['parent_id'] = None
-    
-    return metadata
+    return {
+        'title': page.get('title') or None,
+        'page_id': page.get('id') or None,
+        'space_key': space.get('key') or None,
+        'author': created_by.get('displayName') or None,
+        'created': history.get('createdDate') or None,
+        'modified': version.get('when') or None,
+        # URL (relative from API, prepend base URL)
+        'url': base_url + webui_link if webui_link else None,
+        # Parent ID (from ancestors array, use last one)
+        'parent_id': (ancestors[-1].get('id') or None) if ancestors else None,
+    }
 
 
 def convert_to_markdown(html: str, metadata: dict) -> str:
@@ -93,10 +358,13 @@ def convert_to_markdown(html: str, metadata: dict) -> str:
         Markdown with YAML frontmatter prepended
     """
     # Convert HTML to markdown
-    markdown_body = markdownify(html, heading_style="ATX")
+    markdown_body = _html_to_markdown(html)
     
-    # Generate YAML frontmatter (safe_dump prevents injection)
-    yaml_str = yaml.safe_dump(metadata, default_flow_style=False, allow_unicode=True)
+    # Generate YAML frontmatter (safe dumper prevents injection)
+    dumper = _YAML_DUMPER
+    if any(isinstance(value, str) and not value.isascii() and _NON_BMP.search(value) for value in metadata.values()):
+        dumper = yaml.SafeDumper
+    yaml_str = yaml.dump(metadata, Dumper=dumper, default_flow_style=False, allow_unicode=True)
     
     # Remove trailing newline from YAML to control formatting
     yaml_str = yaml_str.rstrip('\n')
@@ -105,3 +373,30 @@ def convert_to_markdown(html: str, metadata: dict) -> str:
     result = f"---\n{yaml_str}\n---\n\n{markdown_body}"
     
     return result
+
+
+def read_frontmatter(filepath: Path) -> Optional[dict]:
+    """Read YAML frontmatter from a previously exported markdown file.
+    
+    Args:
+        filepath: Path to markdown file
+        
+    Returns:
+        Frontmatter dictionary, or None if the file is missing or has none
+    """
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            if f.readline().rstrip('\n') != '---':
+                return None
+            lines = []
+            for line in f:
+                if line.rstrip('\n') == '---':
+                    break
+                lines.append(line)
+            else:
+                return None
+        frontmatter = yaml.load(''.join(lines), Loader=_YAML_LOADER)
+    except (OSError, UnicodeDecodeError, yaml.YAMLError):
+        return None
+    
+    return frontmatter if isinstance(frontmatter, dict) else None
@@ -1,34 +1,132 @@
-"""Recursive page exporter with rate limiting and error handling."""
+"""Concurrent page tree exporter with error handling."""
 import logging
-import time
+import os
+import queue
+import sys
+import threading
+from collections import deque
+from concurrent.futures import CancelledError, ThreadPoolExecutor
 from pathlib import Path
-from typing import Tuple
+from typing import Dict, List, Optional, Set, Tuple
 from .client import ConfluenceClient
-from .converter import slugify, extract_metadata, convert_to_markdown
+from .converter import slugify, extract_metadata, convert_to_markdown, read_frontmatter
 
 logger = logging.getLogger(__name__)
 
+# open() flags for page files: new names are created exclusively so a file
+# that appeared after the directory was listed is never clobbered; O_BINARY
+# keeps the Windows C runtime from altering the bytes written
+_CREATE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+_OVERWRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+
+# Converted pages buffered for the writer thread in bulk mode
+WRITE_QUEUE_SIZE = 64
+
+
+def _encode_markdown(text: str) -> bytes:
+    """Encode page markdown for writing: UTF-8 with platform newlines like text mode."""
+    if os.linesep != '\n':
+        text = text.replace('\n', os.linesep)
+    return text.encode('utf-8')
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    """Write bytes to a raw file descriptor, bypassing buffered I/O.
+    
+    The payload goes out in a single write() call (repeated only if the OS
+    accepts a partial write).
+    """
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _write_and_close(fd: int, filepath: str, data: bytes) -> None:
+    """Write encoded page markdown to an open file descriptor, close it and log the file."""
+    try:
+        _write_all(fd, data)
+    finally:
+        os.close(fd)
+    logger.info("Created: %s", filepath)
+
+
+def _drain_writes(write_queue: queue.Queue, failed_pages: List[str]) -> None:
+    """Writer thread: write queued (fd, filepath, page_id, data) items until None.
+    
+    Args:
+        write_queue: Queue of pending writes, terminated by None
+        failed_pages: Receives the IDs of pages whose write failed
+    """
+    while True:
+        item = write_queue.get()
+        if item is None:
+            return
+        fd, filepath, page_id, data = item
+        try:
+            _write_and_close(fd, filepath, data)
+        except OSError as e:
+            logger.error("Failed to export page %s: %s", page_id, e)
+            failed_pages.append(page_id)
+
+
+def _cancel_queued(pool: ThreadPoolExecutor) -> None:
+    """Cancel an executor's queued (not yet started) work.
+    
+    Needs shutdown(cancel_futures=...) from Python 3.9; on 3.8 queued work
+    still runs when the executor shuts down.
+    """
+    if sys.version_info >= (3, 9):
+        pool.shutdown(wait=False, cancel_futures=True)
+
 
 class PageExporter:
-    """Orchestrates recursive Confluence page export."""
+    """Orchestrates concurrent export of a Confluence page tree.
+    
+    API request pacing (--delay-ms) is enforced globally by the client's
+    rate limiter, so it holds regardless of the number of workers.
+    """
     
-    def __init__(self, client: ConfluenceClient, output_path: Path, delay_ms: int, base_url: str, skip_existing: bool = False, max_depth: int = 50):
+    def __init__(self, client: ConfluenceClient, output_path: Path, base_url: str, skip_existing: bool = False, max_depth: int = 50, workers: int = 4, bulk_fetch: bool = False):
         """Initialize exporter.
         
         Args:
             client: Configured ConfluenceClient
             output_path: Root output directory
-            delay_ms: Delay in milliseconds between API calls
             base_url: Base URL for metadata URL construction
-            skip_existing: Skip files that already exist (resume capability)
-            max_depth: Maximum recursion depth to prevent infinite loops (default: 50)
+            skip_existing: Skip pages whose exported file is up to date (resume capability)
+            max_depth: Maximum tree depth to prevent infinite loops (default: 50)
+            workers: Number of pages exported concurrently (default: 4)
+            bulk_fetch: Fetch the whole subtree through CQL search instead of page by page
         """
         self.client = client
         self.output_path = Path(output_path)
-        self.delay_ms = delay_ms
         self.base_url = base_url
         self.skip_existing = skip_existing
         self.max_depth = max_depth
+        self.workers = max(workers, 1)
+        self.bulk_fetch = bulk_fetch
+        # Serializes filename allocation across workers
+        self._write_lock = threading.Lock()
+        # Filenames per output directory: listed once, then extended with every
+        # name handed out (reserved before it is written, so writes can proceed
+        # outside the lock)
+        self._dir_cache: Dict[Path, Set[str]] = {}
+        # Last collision counter handed out per (directory, slug); names are
+        # never released, so probing can resume there (1 = no suffix)
+        self._slug_counter: Dict[Tuple[Path, str], int] = {}
+        # Output directories already created in this run
+        self._created_dirs: Set[Path] = set()
+    
+    def _list_directory(self, directory: Path) -> Set[str]:
+        """Return the cached set of filenames in a directory, listing it on first use."""
+        names = self._dir_cache.get(directory)
+        if names is None:
+            try:
+                names = set(os.listdir(directory))
+            except FileNotFoundError:
+                names = set()
+            names = self._dir_cache.setdefault(directory, names)
+        return names
     
     def _generate_unique_filename(self, base_slug: str, directory: Path) -> str:
         """Generate unique filename handling slug collisions.
@@ -40,112 +138,348 @@ class PageExporter:
         Returns:
             Unique filename with .md extension
         """
-        filename = f"{base_slug}.md"
-        filepath = directory / filename
+        names = self._list_directory(directory)
+        key = (directory, base_slug)
+        counter = self._slug_counter.get(key, 1)
+        filename = f"{base_slug}.md" if counter == 1 else f"{base_slug}-{counter}.md"
+        
+        # Check for collision (on disk or reserved by another worker) and
+        # append counter suffix (-2, -3, etc.)
+        while filename in names:
+            counter += 1
+            filename = f"{base_slug}-{counter}.md"
         
-        # Check for collision
-        if not filepath.exists():
-            return filename
+        self._slug_counter[key] = counter
+        return filename
+    
+    def _reserve_filename(self, page: dict, directory: Path) -> str:
+        """Allocate a unique filename for a page and reserve it until written.
         
-        # Append counter suffix (-2, -3, etc.)
-        counter = 2
+        Args:
+            page: Confluence page object (needs title)
+            directory: Target directory
+            
+        Returns:
+            Unique filename with .md extension
+        """
+        slug = slugify(page.get('title', 'untitled'))
+        with self._write_lock:
+            filename = self._generate_unique_filename(slug, directory)
+            self._list_directory(directory).add(filename)
+        return filename
+    
+    def _create_page_file(self, page: dict, directory: Path, filename: Optional[str] = None) -> Tuple[str, int]:
+        """Create a page's file exclusively under a unique filename.
+        
+        Args:
+            page: Confluence page object (needs title)
+            directory: Target directory (must exist)
+            filename: Name already reserved for the page (default: reserve one)
+            
+        Returns:
+            Tuple of (filename, open file descriptor)
+        """
         while True:
+            if filename is None:
+                filename = self._reserve_filename(page, directory)
+            filepath = os.path.join(directory, filename)
+            try:
+                return filename, os.open(filepath, _CREATE_FLAGS, 0o644)
+            except FileExistsError:
+                # Created by someone else since the directory was listed; the
+                # name stays reserved, so the next attempt takes the next suffix
+                logger.debug("File appeared since listing, retrying: %s", filepath)
+                filename = None
+    
+    def _find_exported_file(self, page: dict, directory: Path) -> Tuple[Optional[str], Optional[dict]]:
+        """Find the file a previous run exported for this page.
+        
+        Walks the slug collision chain (slug.md, slug-2.md, ...) and matches
+        the page_id recorded in each file's frontmatter.
+        
+        Args:
+            page: Confluence page object (needs id and title)
+            directory: Directory the page is exported to
+            
+        Returns:
+            Tuple of (filename, frontmatter), or (None, None) if not exported yet
+        """
+        base_slug = slugify(page.get('title', 'untitled'))
+        page_id = str(page.get('id'))
+        names = self._list_directory(directory)
+        filename = f"{base_slug}.md"
+        counter = 2
+        while filename in names:
+            frontmatter = read_frontmatter(directory / filename)
+            if frontmatter and str(frontmatter.get('page_id')) == page_id:
+                return filename, frontmatter
             filename = f"{base_slug}-{counter}.md"
-            filepath = directory / filename
-            if not filepath.exists():
-                return filename
             counter += 1
+        return None, None
     
-    def _apply_rate_limit(self):
-        """Sleep for configured delay (rate limiting)."""
-        if self.delay_ms > 0:
-            time.sleep(self.delay_ms / 1000.0)
+    def _find_up_to_date(self, page: dict, directory: Path) -> Tuple[Optional[str], bool]:
+        """Look up a page's previous export and compare version timestamps.
+        
+        Args:
+            page: Confluence page object (needs id, title and version)
+            directory: Directory the page is exported to
+            
+        Returns:
+            Tuple of (existing filename or None, whether it is up to date)
+        """
+        existing_filename, frontmatter = self._find_exported_file(page, directory)
+        modified = page.get('version', {}).get('when')
+        up_to_date = bool(existing_filename and modified and frontmatter.get('modified') == modified)
+        return existing_filename, up_to_date
     
-    def _write_page_file(self, page: dict, parent_path: Path, base_url: str) -> str:
+    def _write_page_file(self, page: dict, parent_path: Path, base_url: str, filename: Optional[str] = None, overwrite: bool = False, write_queue: Optional[queue.Queue] = None) -> str:
         """Write a single page to disk.
         
         Args:
-            page: Confluence page object
+            page: Confluence page object as returned by the client (with '_html')
             parent_path: Parent directory for the file
             base_url: Base URL for metadata
+            filename: Reserved or existing filename (default: generate a unique one)
+            overwrite: Replace the existing file named by filename
+            write_queue: Hand the opened file to a writer thread instead of writing inline
             
         Returns:
             Actual filename (without .md extension) for child directory creation
         """
         # Extract metadata and convert to markdown
         metadata = extract_metadata(page, base_url)
-        html_body = page.get('body', {}).get('storage', {}).get('value', '')
-        markdown = convert_to_markdown(html_body, metadata)
-        
-        # Generate slug and check for collision
-        slug = slugify(page.get('title', 'untitled'))
-        filename = self._generate_unique_filename(slug, parent_path)
-        
-        # Create directory if needed
-        parent_path.mkdir(parents=True, exist_ok=True)
+        # Encode once here, so the write path (and writer thread) only moves bytes
+        data = _encode_markdown(convert_to_markdown(page['_html'], metadata))
         
-        # Check if file exists and skip_existing is enabled
-        filepath = parent_path / filename
-        if self.skip_existing and filepath.exists():
-            logger.info(f"Skipped (exists): {filepath}")
-            # Return actual filename without extension for child directory
-            return filename[:-3] if filename.endswith('.md') else filename
+        # Create directory if needed (once per directory per run)
+        if parent_path not in self._created_dirs:
+            parent_path.mkdir(parents=True, exist_ok=True)
+            self._created_dirs.add(parent_path)
         
-        # Write file
-        filepath.write_text(markdown, encoding='utf-8')
+        # Generate slug and check for collision; the exclusive create doubles as
+        # the existence check, so no separate stat is needed
+        if overwrite:
+            fd = os.open(os.path.join(parent_path, filename), _OVERWRITE_FLAGS, 0o644)
+        else:
+            filename, fd = self._create_page_file(page, parent_path, filename)
         
-        logger.info(f"Created: {filepath}")
+        # Write file (concurrently with other workers' writes and requests); the
+        # filename is final once the file is open, so the write itself can be deferred
+        filepath = os.path.join(parent_path, filename)
+        if write_queue is not None:
+            write_queue.put((fd, filepath, page.get('id'), data))
+        else:
+            _write_and_close(fd, filepath, data)
         
         # Return actual filename without extension for child directory
         return filename[:-3] if filename.endswith('.md') else filename
     
-    def export_tree(self, root_page_id: str, parent_directory: Path, depth: int = 0) -> Tuple[int, int]:
-        """Recursively export page and all children.
+    def _export_page(self, page_id: str, parent_directory: Path, filename: Optional[str], listing_pool: ThreadPoolExecutor) -> Optional[Tuple[Path, List[dict]]]:
+        """Export a single page and list its children (runs in a worker thread).
         
         Args:
-            root_page_id: Page ID to export
+            page_id: Page ID to export
             parent_directory: Directory where this page's file will be created
-            depth: Current recursion depth (internal, starts at 0)
+            filename: Filename reserved for this page (None: allocate on write)
+            listing_pool: Executor that lists the children while the page is exported
             
         Returns:
-            Tuple of (success_count, failure_count)
+            Tuple of (child_directory, child pages), or None if the page failed
         """
-        # Check recursion depth limit
-        if depth >= self.max_depth:
-            logger.error(f"Maximum recursion depth ({self.max_depth}) reached for page {root_page_id}")
-            return (0, 1)
-        
+        # Children don't depend on the page body, so list them while the page
+        # is fetched and written
+        children_future = listing_pool.submit(self.client.get_child_pages, page_id)
         try:
-            # Fetch root page
-            logger.info(f"Fetching page: {root_page_id}")
-            page = self.client.get_page(root_page_id)
-            self._apply_rate_limit()
+            logger.info("Fetching page: %s", page_id)
+            actual_filename = None
+            existing_filename = None
             
-            # Write root page to disk (returns actual filename used)
-            actual_filename = self._write_page_file(page, parent_directory, self.base_url)
+            if self.skip_existing:
+                # Compare version timestamps first so up-to-date pages skip the full fetch
+                summary = self.client.get_page_metadata_only(page_id)
+                existing_filename, up_to_date = self._find_up_to_date(summary, parent_directory)
+                if up_to_date:
+                    logger.info("Skipped (up to date): %s", os.path.join(parent_directory, existing_filename))
+                    actual_filename = existing_filename[:-3]
             
-            # Initialize counters (root succeeded)
-            success_count = 1
-            failure_count = 0
+            if actual_filename is None:
+                # Write page to disk (returns actual filename used), then release
+                # the page so its HTML body isn't held while children are listed
+                page = self.client.get_page(page_id)
+                if existing_filename:
+                    actual_filename = self._write_page_file(page, parent_directory, self.base_url, existing_filename, overwrite=True)
+                else:
+                    actual_filename = self._write_page_file(page, parent_directory, self.base_url, filename)
+                del page
             
             # Create child directory using actual filename (handles collision case)
             child_directory = parent_directory / actual_filename
+            return child_directory, [child for child in children_future.result() if child.get('id')]
             
-            # Fetch children
-            children = self.client.get_child_pages(root_page_id)
-            self._apply_rate_limit()
-            
-            # Recursively export each child
-            for child in children:
-                child_id = child.get('id')
-                if child_id:
-                    child_success, child_failure = self.export_tree(child_id, child_directory, depth + 1)
-                    success_count += child_success
-                    failure_count += child_failure
+        except CancelledError:
+            # Export interrupted; children are not exported either way
+            return None
+        except Exception as e:
+            # Log error and count as failure
+            children_future.cancel()
+            logger.error("Failed to export page %s: %s", page_id, e)
+            return None
+    
+    def _export_fetched_tree(self, root: dict, children: Dict[str, List[dict]], parent_directory: Path) -> Tuple[int, int]:
+        """Write an already fetched page tree (no further API calls).
+        
+        Walks depth-first with an explicit stack, so tree depth is bounded
+        only by max_depth, not by the interpreter's recursion limit. Pages are
+        converted on this thread while a writer thread writes the previous ones.
+        
+        Args:
+            root: Fully expanded root page object
+            children: Child pages keyed by parent page ID
+            parent_directory: Directory where the root page's file will be created
             
-            return (success_count, failure_count)
+        Returns:
+            Tuple of (success_count, failure_count)
+        """
+        success_count = 0
+        failure_count = 0
+        stack = deque([(root, parent_directory, 0)])
+        write_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        failed_writes: List[str] = []
+        writer = threading.Thread(target=_drain_writes, args=(write_queue, failed_writes), daemon=True)
+        writer.start()
+        
+        try:
+            while stack:
+                page, directory, depth = stack.pop()
+                page_id = str(page.get('id'))
+                
+                # Check depth limit
+                if depth >= self.max_depth:
+                    logger.error("Maximum recursion depth (%d) reached for page %s", self.max_depth, page_id)
+                    failure_count += 1
+                    continue
+                
+                try:
+                    actual_filename = None
+                    existing_filename = None
+                    if self.skip_existing:
+                        existing_filename, up_to_date = self._find_up_to_date(page, directory)
+                        if up_to_date:
+                            logger.info("Skipped (up to date): %s", os.path.join(directory, existing_filename))
+                            actual_filename = existing_filename[:-3]
+                    if actual_filename is None:
+                        actual_filename = self._write_page_file(page, directory, self.base_url, existing_filename, overwrite=existing_filename is not None, write_queue=write_queue)
+                except Exception as e:
+                    logger.error("Failed to export page %s: %s", page_id, e)
+                    failure_count += 1
+                    continue
+                
+                success_count += 1
+                # Push children reversed so they are popped (and named) in sibling order
+                child_directory = directory / actual_filename
+                stack.extend((child, child_directory, depth + 1) for child in reversed(children.get(page_id, [])))
+        finally:
+            write_queue.put(None)
+            writer.join()
+        
+        # Pages whose deferred write failed were counted as exported
+        success_count -= len(failed_writes)
+        failure_count += len(failed_writes)
+        return (success_count, failure_count)
+    
+    def _export_tree_bulk(self, root_page_id: str, parent_directory: Path) -> Tuple[int, int]:
+        """Export page and all descendants from a single CQL search.
+        
+        Args:
+            root_page_id: Page ID to export
+            parent_directory: Directory where the root page's file will be created
             
+        Returns:
+            Tuple of (success_count, failure_count)
+        """
+        try:
+            logger.info("Fetching page tree: %s", root_page_id)
+            root = self.client.get_page(root_page_id)
+            descendants = self.client.search_descendants(root_page_id)
         except Exception as e:
-            # Log error and count as failure
-            logger.error(f"Failed to export page {root_page_id}: {e}")
+            logger.error("Failed to export page %s: %s", root_page_id, e)
             return (0, 1)
+        
+        # Rebuild the hierarchy from each page's direct parent (last ancestor)
+        children: Dict[str, List[dict]] = {}
+        for page in descendants:
+            ancestors = page.get('ancestors') or []
+            if ancestors:
+                children.setdefault(str(ancestors[-1].get('id')), []).append(page)
+        
+        return self._export_fetched_tree(root, children, Path(parent_directory))
+    
+    def export_tree(self, root_page_id: str, parent_directory: Path) -> Tuple[int, int]:
+        """Export page and all descendants using a pool of worker threads.
+        
+        Each worker exports one page and lists its children; this thread
+        schedules the children once their parent completes. With
+        bulk_fetch, the subtree is fetched through CQL search instead.
+        
+        Args:
+            root_page_id: Page ID to export
+            parent_directory: Directory where the root page's file will be created
+            
+        Returns:
+            Tuple of (success_count, failure_count)
+        """
+        if self.bulk_fetch:
+            return self._export_tree_bulk(root_page_id, parent_directory)
+        
+        success_count = 0
+        failure_count = 0
+        
+        # Child listings get their own pool: a worker waiting on a listing
+        # queued behind other waiting workers in the same pool would deadlock
+        with ThreadPoolExecutor(max_workers=self.workers) as pool, ThreadPoolExecutor(max_workers=self.workers) as listing_pool:
+            # Results are handled in submission order (breadth-first), while the
+            # workers run ahead, so names, duplicates and the directory of a page
+            # listed under several parents don't depend on worker timing
+            pending = deque()
+            # Page IDs already queued, so cycles or a page reachable through
+            # more than one parent are exported once (under the first parent)
+            visited = set()
+            
+            def schedule(page: dict, directory: Path, depth: int, reserve: bool):
+                nonlocal failure_count
+                page_id = page['id']
+                if page_id in visited:
+                    logger.debug("Page %s already exported, skipping duplicate under %s", page_id, directory)
+                    return
+                # Check depth limit before queueing
+                if depth >= self.max_depth:
+                    logger.error("Maximum recursion depth (%d) reached for page %s", self.max_depth, page_id)
+                    failure_count += 1
+                    return
+                visited.add(page_id)
+                # Reserve names in sibling order; with skip_existing children may
+                # already have files, which are looked up by page ID on export
+                filename = self._reserve_filename(page, directory) if reserve else None
+                pending.append((pool.submit(self._export_page, page_id, directory, filename, listing_pool), depth))
+            
+            schedule({'id': root_page_id}, Path(parent_directory), 0, reserve=False)
+            try:
+                while pending:
+                    future, depth = pending.popleft()
+                    result = future.result()
+                    if result is None:
+                        failure_count += 1
+                        continue
+                    success_count += 1
+                    child_directory, children = result
+                    for child in children:
+                        schedule(child, child_directory, depth + 1, reserve=not self.skip_existing)
+            except BaseException:
+                # Interrupted (e.g. Ctrl-C): drop queued pages so leaving the
+                # executors only waits for pages already in progress
+                for future, _ in pending:
+                    future.cancel()
+                _cancel_queued(listing_pool)
+                raise
+        
+        return (success_count, failure_count)
@@ -0,0 +1,71 @@
+"""Tests for the HTML-to-Markdown converter and frontmatter."""
+import pytest
+import yaml
+
+from confluence_md import converter
+
+requires_lxml = pytest.mark.skipif(converter.lxml_html is None, reason="lxml not installed")
+
+
+def _code_macro(code: str, language: str = 'python') -> str:
+    return (
+        '<ac:structured-macro ac:name="code">'
+        f'<ac:parameter ac:name="language">{language}</ac:parameter>'
+        f'<ac:plain-text-body><![CDATA[{code}]]></ac:plain-text-body>'
+        '</ac:structured-macro>'
+    )
+
+
+@requires_lxml
+@pytest.mark.parametrize('code', [
+    'def f() -> int:\n    return 1',
+    'echo hi > out.txt',
+    'if (a > b) { return; }',
+    '<!-- note --> -->',
+    '<div class="x">&amp; <b>bold</b></div>',
+])
+def test_code_macro_keeps_body(code):
+    assert converter._html_to_markdown(_code_macro(code)) == f"```python\n{code}\n```"
+
+
+@requires_lxml
+def test_code_macro_keeps_split_cdata_terminator():
+    # Storage format encodes a literal ']]>' by splitting the CDATA section
+    html = _code_macro('a = "]]]]><![CDATA[>"')
+    assert converter._html_to_markdown(html) == '```python\na = "]]>"\n```'
+
+
+@requires_lxml
+def test_noformat_macro_without_language():
+    html = '<ac:structured-macro ac:name="noformat"><ac:plain-text-body><![CDATA[x > y]]></ac:plain-text-body></ac:structured-macro>'
+    assert converter._html_to_markdown(html) == "```\nx > y\n```"
+
+
+@requires_lxml
+def test_list_item_paragraphs_stay_separate():
+    html = '<ul><li><p>a</p><p>b</p></li><li><p>c</p></li></ul>'
+    assert converter._html_to_markdown(html) == "* a\n\n  b\n* c"
+
+
+@requires_lxml
+def test_nested_list_stays_tight():
+    html = '<ul><li><p>a</p><ul><li>b</li></ul></li></ul>'
+    assert converter._html_to_markdown(html) == "* a\n  + b"
+
+
+@requires_lxml
+def test_ordered_list_continuation_indent():
+    html = '<ol><li><p>first</p><p>more</p></li></ol>'
+    assert converter._html_to_markdown(html) == "1. first\n\n   more"
+
+
+@pytest.mark.parametrize('title', ['Release 🚀 notes', 'Café 中文', 'Plain title'])
+def test_frontmatter_matches_safe_dump(title):
+    metadata = {'title': title, 'page_id': '1', 'author': None}
+    expected = yaml.safe_dump(metadata, default_flow_style=False, allow_unicode=True).rstrip('\n')
+    assert converter.convert_to_markdown('', metadata) == f"---\n{expected}\n---\n\n"
+
+
+def test_frontmatter_keeps_emoji_literal():
+    result = converter.convert_to_markdown('', {'title': 'Release 🚀 notes'})
+    assert 'title: Release 🚀 notes' in result
@@ -0,0 +1,156 @@
+"""Tests for PageExporter.export_tree against an in-memory Confluence."""
+import random
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from confluence_md.converter import read_frontmatter
+from confluence_md.exporter import PageExporter
+
+
+class FakeClient:
+    """In-memory page tree: page ID -> (title, child IDs, version timestamp)."""
+
+    def __init__(self, tree, jitter=0.0):
+        self.tree = tree
+        self.jitter = jitter
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def _record(self, method, page_id):
+        with self._lock:
+            self.calls[method, page_id] += 1
+        if self.jitter:
+            # Randomize completion order across workers
+            time.sleep(random.random() * self.jitter)
+
+    def _parent(self, page_id):
+        return next((pid for pid, (_, children, _) in self.tree.items() if page_id in children), None)
+
+    def _page(self, page_id):
+        title, _, when = self.tree[page_id]
+        parent = self._parent(page_id)
+        return {
+            'id': page_id,
+            'title': title,
+            'version': {'when': when},
+            'space': {'key': 'SP'},
+            'history': {'createdBy': {'displayName': 'Author'}, 'createdDate': '2024-01-01'},
+            'ancestors': [{'id': parent}] if parent else [],
+            '_links': {'webui': f'/pages/{page_id}'},
+            '_html': f'<p>Body of {title} at {when}</p>',
+        }
+
+    def get_page(self, page_id):
+        self._record('get_page', page_id)
+        return self._page(page_id)
+
+    def get_page_metadata_only(self, page_id):
+        self._record('get_page_metadata_only', page_id)
+        title, _, when = self.tree[page_id]
+        return {'id': page_id, 'title': title, 'version': {'when': when}}
+
+    def get_child_pages(self, page_id):
+        self._record('get_child_pages', page_id)
+        return [{'id': child, 'title': self.tree[child][0]} for child in self.tree[page_id][1]]
+
+    def search_descendants(self, page_id):
+        self._record('search_descendants', page_id)
+        found, stack = [], list(reversed(self.tree[page_id][1]))
+        while stack:
+            child = stack.pop()
+            found.append(self._page(child))
+            stack.extend(reversed(self.tree[child][1]))
+        return found
+
+    def count(self, method):
+        return sum(n for (name, _), n in self.calls.items() if name == method)
+
+
+def _export(client, output, **kwargs):
+    exporter = PageExporter(client=client, output_path=output, base_url='https://wiki', **kwargs)
+    return exporter.export_tree('1', output)
+
+
+def _page_id(path):
+    return str(read_frontmatter(path)['page_id'])
+
+
+EXPORT_MODES = [
+    pytest.param({'workers': 1}, id='workers=1'),
+    pytest.param({'workers': 16}, id='workers=16'),
+    pytest.param({'bulk_fetch': True}, id='bulk_fetch'),
+]
+
+
+@pytest.mark.parametrize('mode', EXPORT_MODES)
+def test_same_titled_siblings_are_named_in_sibling_order(tmp_path, mode):
+    tree = {
+        '1': ('Root', ['2', '3', '4', '5'], 'v1'),
+        '2': ('Same', ['6'], 'v1'),
+        '3': ('Same', ['7'], 'v1'),
+        '4': ('Same', [], 'v1'),
+        '5': ('Other', [], 'v1'),
+        '6': ('Leaf', [], 'v1'),
+        '7': ('Leaf', [], 'v1'),
+    }
+    assert _export(FakeClient(tree, jitter=0.01), tmp_path, **mode) == (7, 0)
+
+    root = tmp_path / 'root'
+    assert _page_id(tmp_path / 'root.md') == '1'
+    assert _page_id(root / 'same.md') == '2'
+    assert _page_id(root / 'same-2.md') == '3'
+    assert _page_id(root / 'same-3.md') == '4'
+    assert _page_id(root / 'other.md') == '5'
+    assert _page_id(root / 'same' / 'leaf.md') == '6'
+    assert _page_id(root / 'same-2' / 'leaf.md') == '7'
+
+
+@pytest.mark.parametrize('workers', [1, 16])
+def test_page_under_two_parents_is_exported_once_under_the_first(tmp_path, workers):
+    # Page 4 is listed under both A and B and links back to the root (a cycle);
+    # B also has its own page with the same title
+    tree = {
+        '1': ('Root', ['2', '3'], 'v1'),
+        '2': ('A', ['4'], 'v1'),
+        '3': ('B', ['4', '5'], 'v1'),
+        '4': ('Child', ['1'], 'v1'),
+        '5': ('Child', [], 'v1'),
+    }
+    client = FakeClient(tree, jitter=0.01)
+    assert _export(client, tmp_path, workers=workers) == (5, 0)
+
+    assert _page_id(tmp_path / 'root' / 'a' / 'child.md') == '4'
+    assert _page_id(tmp_path / 'root' / 'b' / 'child.md') == '5'
+    assert not (tmp_path / 'root' / 'b' / 'child-2.md').exists()
+    assert all(n == 1 for (method, _), n in client.calls.items() if method == 'get_page')
+
+
+def test_skip_existing_refetches_only_changed_and_new_pages(tmp_path):
+    tree = {
+        '1': ('Root', ['2', '3'], 'v1'),
+        '2': ('Changed', [], 'v1'),
+        '3': ('Unchanged', [], 'v1'),
+    }
+    assert _export(FakeClient(tree), tmp_path) == (3, 0)
+    changed = tmp_path / 'root' / 'changed.md'
+
+    # Nothing changed: only version checks, no full fetch
+    client = FakeClient(tree)
+    assert _export(client, tmp_path, skip_existing=True) == (3, 0)
+    assert client.count('get_page') == 0
+
+    # One page edited, one added
+    tree['2'] = ('Changed', [], 'v2')
+    tree['4'] = ('New', [], 'v1')
+    tree['1'] = ('Root', ['2', '3', '4'], 'v1')
+    client = FakeClient(tree)
+    assert _export(client, tmp_path, skip_existing=True) == (4, 0)
+    assert {page_id for (method, page_id) in client.calls if method == 'get_page'} == {'2', '4'}
+
+    # The changed page is overwritten in place, not written under a new name
+    assert read_frontmatter(changed)['modified'] == 'v2'
+    assert 'Body of Changed at v2' in changed.read_text(encoding='utf-8')
+    assert sorted(p.name for p in (tmp_path / 'root').iterdir()) == ['changed.md', 'new.md', 'unchanged.md']